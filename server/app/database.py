@@ -1,19 +1,70 @@
+# Standard library imports for tracking the current session scope
+from contextvars import ContextVar  # Holds the identity of the request being served
+import threading  # Fallback scope for code running outside of a request
+
 # Import necessary modules and libraries for SQLAlchemy
-from sqlalchemy import create_engine  # Used to create the database engine
-from sqlalchemy.orm import sessionmaker  # Creates a configured session class for database operations
+from sqlalchemy import create_engine, event  # Used to create the database engine and hook its connections
+from sqlalchemy.orm import sessionmaker, scoped_session  # Session factory and the registry reusing its sessions
+from sqlalchemy.pool import StaticPool  # Single shared connection, required for in-memory SQLite databases
 from sqlalchemy.ext.declarative import declarative_base  # Base class for defining ORM models
 
 # Import the database URL configuration from the application's config file
-from app.config import DATABASE_URL  # Import the database connection URL from config
+from app.config import DATABASE_URL, DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, \
+    DB_POOL_RECYCLE, DB_QUERY_CACHE_SIZE  # Import the database connection URL and engine settings from config
 
 # Connect to the database specified in the configuration
 # `create_engine` is responsible for setting up the database connection.
 # The `check_same_thread` argument is set to False to allow multi-threaded applications to work with SQLite.
-engine = create_engine(DATABASE_URL, connect_args={'check_same_thread': False})
+if DATABASE_URL.endswith(':memory:'):
+    # An in-memory database only exists on its connection, so every session must share that single connection
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={'check_same_thread': False},
+        poolclass=StaticPool,
+        query_cache_size=DB_QUERY_CACHE_SIZE
+    )
+else:
+    engine = create_engine(
+        DATABASE_URL,
+        connect_args={'check_same_thread': False},
+        pool_size=DB_POOL_SIZE,  # Connections kept open for concurrent requests
+        max_overflow=DB_MAX_OVERFLOW,  # Extra connections allowed during bursts
+        pool_timeout=DB_POOL_TIMEOUT,  # Wait this long for a free connection before failing
+        pool_pre_ping=True,  # Transparently replace dead connections instead of failing the request
+        pool_recycle=DB_POOL_RECYCLE,  # Periodically replace long-lived connections
+        query_cache_size=DB_QUERY_CACHE_SIZE  # Compiled SQL statements kept for reuse
+    )
+
+# Tune every new SQLite connection once, when the pool opens it (not on every request)
+if engine.dialect.name == 'sqlite':
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, _connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')  # Readers no longer block writers (and vice versa)
+        cursor.execute('PRAGMA synchronous=NORMAL')  # Only fsync the WAL at checkpoints; safe in WAL mode
+        cursor.execute('PRAGMA temp_store=MEMORY')  # Keep temporary tables and indices in memory
+        cursor.execute('PRAGMA mmap_size=268435456')  # Memory-map up to 256 MiB of the database file
+        cursor.close()
+
+# Identifies the request currently being served; set by `DBSessionMiddleware`
+_request_scope = ContextVar('request_scope', default=None)
+
+
+def _session_scope():
+    """
+    Return the key under which `SessionLocal` stores the current session.
+
+    Requests are keyed by their own scope rather than by thread, since concurrent `async` routes share the
+    event loop thread. Code running outside of a request falls back to one session per thread.
+    """
+    scope = _request_scope.get()
+    return scope if scope is not None else threading.get_ident()
+
 
-# Create a session factory bound to the engine
+# Create a session registry bound to the engine
 # Sessions are used to interact with the database (e.g., query, add, delete data).
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# The registry hands out the same session for the whole request instead of building a new one per dependency.
+SessionLocal = scoped_session(sessionmaker(autocommit=False, autoflush=False, bind=engine), scopefunc=_session_scope)
 
 # Define the base class for database models
 # All ORM models will inherit from `Base`, which includes metadata and mappings.
@@ -23,19 +74,38 @@ Base = declarative_base()
 # Dependency to get a database session
 def get_db_session():
     """
-    Dependency function to get a new SQLAlchemy session for interacting with the database.
+    Dependency function to get the SQLAlchemy session for the current request.
 
-    Creates a session using `SessionLocal()` and ensures the session is properly closed
-    after the request is finished.
+    The session is taken from the `SessionLocal` registry, so every dependency within a request shares it.
+    It is closed by `DBSessionMiddleware` once the request is finished.
 
-    Yields:
-    - db (SessionLocal): A database session object.
+    Returns:
+    - db (Session): A database session object.
     """
-    # Create a new database session
-    db = SessionLocal()
-    try:
-        # Yield the session to be used in route handlers
-        yield db
-    finally:
-        # Close the session after the request lifecycle is complete to free up resources
-        db.close()
+    return SessionLocal()
+
+
+class DBSessionMiddleware:
+    """
+    ASGI middleware giving each HTTP request its own session scope.
+
+    Sessions handed out by `SessionLocal` during the request are closed and released once the response
+    has been sent.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        # Open a fresh session scope for this request
+        token = _request_scope.set(object())
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Close the request's session to free up resources
+            SessionLocal.remove()
+            _request_scope.reset(token)
@@ -1,22 +1,45 @@
+# Standard library and third-party imports
+from contextlib import asynccontextmanager  # Builds the application lifespan handler
+
+import anyio  # Async runtime whose threadpool runs FastAPI's sync routes
+
 # Import necessary modules from FastAPI
 from fastapi import FastAPI  # FastAPI class for creating an application instance
 
 # Local application imports
 from app.models import Base  # Base class for defining all SQLAlchemy models
-from app.database import engine  # Database engine to bind models and handle database operations
+from app.database import engine, \
+    DBSessionMiddleware  # Database engine to bind models, and middleware releasing per-request sessions
 from app.routers import authentication, tasks, manager, users  # Import routers for different application modules
+from app.config import THREADPOOL_SIZE, \
+    AUTO_CREATE_TABLES  # Threads running sync routes and dependencies, and whether to create tables on startup
+from app.responses import ORJSONResponse  # JSON response class encoding with orjson
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Application lifespan handler, run once per worker process before it starts serving requests.
+    """
+    # Size the threadpool running sync routes and dependencies (AnyIO defaults to 40 threads)
+    anyio.to_thread.current_default_thread_limiter().total_tokens = THREADPOOL_SIZE
+    # Create any missing tables based on the `Base` metadata (off when the schema is managed elsewhere)
+    if AUTO_CREATE_TABLES:
+        await anyio.to_thread.run_sync(Base.metadata.create_all, engine)
+    yield
+
 
 # Create a FastAPI instance
 app = FastAPI(
     title="Taskify API",  # Name of the API
     description="An API for managing tasks and user accounts",  # Description shown in API docs
-    version="1.0.0"  # Version of the API
+    version="1.0.0",  # Version of the API
+    default_response_class=ORJSONResponse,  # Encode every JSON response with orjson
+    lifespan=lifespan  # Startup configuration for each worker process
 )
 
-# Create all the database tables based on the SQLAlchemy models
-# This will create tables if they don't exist, based on the `Base` metadata
-Base.metadata.create_all(bind=engine)
-
+# Close each request's database session once its response has been sent
+app.add_middleware(DBSessionMiddleware)
 
 @app.get("/health", status_code=200)
 def health_check():
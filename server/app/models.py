@@ -1,6 +1,8 @@
 # Import base class for models and necessary SQLAlchemy modules
 from app.database import Base  # Base class from which all ORM models will inherit
-from sqlalchemy import Column, Integer, String, Boolean, ForeignKey  # SQLAlchemy modules for defining ORM mappings
+from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, \
+    Index  # SQLAlchemy modules for defining ORM mappings
+from sqlalchemy.orm import relationship  # Links the User and Task models together
 
 
 # Define the User model for storing user-related information
@@ -9,10 +11,10 @@ class User(Base):
 
     # Unique ID for each user (Primary Key)
     id = Column(Integer, primary_key=True, index=True)
-    # Username of the user, must be unique and non-nullable
-    username = Column(String, unique=True, nullable=False)
-    # User's email address, must be unique and non-nullable
-    email = Column(String, unique=True, nullable=False)
+    # Username of the user, must be unique and non-nullable (backed by a unique index for login lookups)
+    username = Column(String, unique=True, index=True, nullable=False)
+    # User's email address, must be unique and non-nullable (backed by a unique index for sign-up checks)
+    email = Column(String, unique=True, index=True, nullable=False)
     # User's first name, non-nullable
     first_name = Column(String, nullable=False)
     # User's last name, non-nullable
@@ -25,6 +27,8 @@ class User(Base):
     role = Column(String, nullable=False)
     # Optional phone number field
     phone_number = Column(String)
+    # Tasks owned by the user; never lazy loaded, queries must opt in (e.g. `selectinload(User.tasks)`)
+    tasks = relationship("Task", back_populates="owner", lazy="raise")
 
     def __repr__(self):
         """
@@ -39,6 +43,10 @@ class User(Base):
 # Define the Task model for storing task-related information
 class Task(Base):
     __tablename__ = 'tasks'  # Name of the table in the database
+    __table_args__ = (
+        # Serves both per-owner listings (leading `owner_id`) and single-task lookups by `(owner_id, id)`
+        Index('ix_tasks_owner_id_id', 'owner_id', 'id'),
+    )
 
     # Unique ID for each task (Primary Key)
     id = Column(Integer, primary_key=True, index=True)
@@ -52,6 +60,8 @@ class Task(Base):
     completed = Column(Boolean, default=False)
     # Foreign key referencing the user who owns the task
     owner_id = Column(Integer, ForeignKey('users.id'))
+    # User owning the task; never lazy loaded, queries must opt in (e.g. `selectinload(Task.owner)`)
+    owner = relationship("User", back_populates="tasks", lazy="raise")
 
     def __repr__(self):
         """
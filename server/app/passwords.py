@@ -0,0 +1,282 @@
+# Standard library imports for running password hashing off the request threads
+from concurrent.futures import ThreadPoolExecutor  # Bounded pool for CPU-heavy password hashing
+from typing import Protocol  # Describes the interface of password hashing backends
+import asyncio  # Awaiting password hashing from async routes
+import os  # Random salts for Argon2id hashes
+import queue  # Queue of pre-generated password salts
+import threading  # Background thread generating salts
+
+# Password hashing libraries
+import bcrypt  # For hashing and verifying legacy (or bcrypt-configured) user passwords
+from argon2 import PasswordHasher  # For hashing and verifying user passwords with Argon2id
+from argon2.exceptions import VerificationError, InvalidHashError  # Raised by Argon2 on mismatching or malformed hashes
+
+# Import the password hashing configuration from the application's config file
+from app.config import PASSWORD_HASH_WORKERS, PASSWORD_HASH_SCHEME, BCRYPT_ROUNDS, ARGON2_TIME_COST, \
+    ARGON2_MEMORY_COST, ARGON2_PARALLELISM, PASSWORD_SALT_QUEUE_SIZE  # Hashing scheme, costs and pool sizes
+
+# Dedicated pool running password hashing, so bursts of logins/sign-ups can't occupy every worker thread with it
+_password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix='password-hash')
+
+# Argon2id hasher with the configured cost parameters
+_argon2_hasher = PasswordHasher(time_cost=ARGON2_TIME_COST, memory_cost=ARGON2_MEMORY_COST,
+                                parallelism=ARGON2_PARALLELISM)
+
+
+def _generate_salt():
+    """
+    Generate a fresh salt for the configured scheme.
+
+    Returns:
+    - Random bytes for Argon2id, or a bcrypt salt (which also carries the configured cost factor).
+    """
+    if PASSWORD_HASH_SCHEME == 'argon2':
+        return os.urandom(_argon2_hasher.salt_len)
+    return bcrypt.gensalt(rounds=BCRYPT_ROUNDS)
+
+
+# Salts generated ahead of time by a background thread, which blocks whenever the queue is full
+_salt_queue = queue.Queue(maxsize=PASSWORD_SALT_QUEUE_SIZE)
+
+
+def _fill_salt_queue(salt_queue: queue.Queue):
+    """
+    Keep the given salt queue topped up; runs forever on the salt generator thread.
+
+    Parameters:
+    - salt_queue (queue.Queue): The queue to fill.
+    """
+    while True:
+        salt_queue.put(_generate_salt())
+
+
+def _start_salt_queue():
+    """
+    Replace the salt queue with an empty one, and start a generator thread filling it.
+    """
+    global _salt_queue
+    _salt_queue = queue.Queue(maxsize=PASSWORD_SALT_QUEUE_SIZE)
+    threading.Thread(target=_fill_salt_queue, args=(_salt_queue,), name='password-salts', daemon=True).start()
+
+
+_start_salt_queue()
+# Forked workers (e.g. gunicorn --preload) inherit the queued salts but not the filler thread, so each child
+# discards them and starts over; otherwise every worker would hand out the same salts (fork is Unix-only)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_start_salt_queue)
+
+
+def _next_salt():
+    """
+    Take a pre-generated salt, generating one on the spot if a burst has drained the queue.
+
+    Returns:
+    - A salt for the configured scheme.
+    """
+    try:
+        return _salt_queue.get_nowait()
+    except queue.Empty:
+        return _generate_salt()
+
+
+def _compute_hash(password: str):
+    """
+    Hash a password with the configured scheme, using a fresh salt for every hash.
+
+    Parameters:
+    - password (str): Plain text password to hash.
+
+    Returns:
+    - The hash of the password.
+    """
+    if PASSWORD_HASH_SCHEME == 'argon2':
+        return _argon2_hasher.hash(password, salt=_next_salt())
+    return bcrypt.hashpw(password.encode('utf-8'), _next_salt()).decode('utf-8')
+
+
+def _check_hash(password: str, hashed_password: str):
+    """
+    Check a password against its stored hash, whichever scheme produced it (its salt and cost are read from it).
+
+    Parameters:
+    - password (str): Plain text password provided by the user.
+    - hashed_password (str): The stored Argon2id or bcrypt hash.
+
+    Returns:
+    - True if the password matches the hash; False otherwise, including for malformed hashes.
+    """
+    if hashed_password.startswith('$argon2'):
+        try:
+            return _argon2_hasher.verify(hashed_password, password)
+        except (VerificationError, InvalidHashError):
+            return False
+    # bcrypt only ever used the first 72 bytes (passlib truncated longer input), while bcrypt 5 rejects them outright
+    try:
+        return bcrypt.checkpw(password.encode('utf-8')[:72], hashed_password.encode('utf-8'))
+    except ValueError:  # Malformed stored hash
+        return False
+
+
+def _needs_rehash(hashed_password: str):
+    """
+    Check whether a stored hash was made with another scheme or weaker parameters than currently configured.
+
+    Parameters:
+    - hashed_password (str): The stored password hash.
+
+    Returns:
+    - True if the password should be re-hashed; False otherwise.
+    """
+    if PASSWORD_HASH_SCHEME == 'argon2':
+        return not hashed_password.startswith('$argon2') or _argon2_hasher.check_needs_rehash(hashed_password)
+    # bcrypt hashes look like `$2b$<rounds>$<salt and hash>`
+    return not hashed_password.startswith('$2') or int(hashed_password.split('$')[2]) != BCRYPT_ROUNDS
+
+
+class PasswordHashBackend(Protocol):
+    """
+    Interface of the backend computing and checking password hashes.
+
+    Its methods are blocking and run on the password hashing pool, so implementations must be thread-safe.
+    Backends computing several hashes faster together than one by one (e.g. SIMD bcrypt builds running
+    multiple Blowfish instances in parallel lanes) implement that in `hash_many`.
+    """
+
+    def hash(self, password: str) -> str:
+        ...
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        ...
+
+    def hash_many(self, passwords: list[str]) -> list[str]:
+        ...
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        ...
+
+
+class DefaultPasswordHashBackend:
+    """
+    Backend hashing with the configured scheme through argon2-cffi or bcrypt, one password at a time.
+    """
+
+    def hash(self, password: str) -> str:
+        return _compute_hash(password)
+
+    def verify(self, password: str, hashed_password: str) -> bool:
+        return _check_hash(password, hashed_password)
+
+    def hash_many(self, passwords: list[str]) -> list[str]:
+        return [_compute_hash(password) for password in passwords]
+
+    def needs_rehash(self, hashed_password: str) -> bool:
+        return _needs_rehash(hashed_password)
+
+
+# Backend used by the password helpers unless another one is passed in
+_password_backend = DefaultPasswordHashBackend()
+
+
+# Dependency to get the password hashing backend
+def get_password_backend():
+    """
+    Dependency providing the password hashing backend; override it to plug in another implementation.
+
+    Returns:
+    - The application's `PasswordHashBackend`.
+    """
+    return _password_backend
+
+
+def password_needs_rehash(hashed_password: str, backend: PasswordHashBackend = None):
+    """
+    Check whether a stored hash was made with another scheme or weaker parameters than currently configured.
+
+    Parameters:
+    - hashed_password (str): The stored password hash.
+    - backend (PasswordHashBackend): Backend that produced the hash; defaults to the application's backend.
+
+    Returns:
+    - True if the password should be re-hashed the next time it is available in plain text; False otherwise.
+    """
+    return (backend or _password_backend).needs_rehash(hashed_password)
+
+
+def hash_password(password: str, backend: PasswordHashBackend = None):
+    """
+    Hash a password with the configured scheme on the bounded password hashing pool.
+
+    Parameters:
+    - password (str): Plain text password to hash.
+    - backend (PasswordHashBackend): Backend computing the hash; defaults to the application's backend.
+
+    Returns:
+    - The hash of the password.
+    """
+    return _password_executor.submit((backend or _password_backend).hash, password).result()
+
+
+def hash_passwords(passwords: list[str], backend: PasswordHashBackend = None):
+    """
+    Hash many passwords at once, e.g. for bulk imports.
+
+    The passwords are split into one batch per hashing pool worker, and each batch is hashed by the
+    backend's `hash_many`, so batches run in parallel and vectorized backends receive several passwords at once.
+
+    Parameters:
+    - passwords (list[str]): Plain text passwords to hash.
+    - backend (PasswordHashBackend): Backend computing the hashes; defaults to the application's backend.
+
+    Returns:
+    - The hashes, in the same order as the passwords.
+    """
+    backend = backend or _password_backend
+    batch_size = -(-len(passwords) // PASSWORD_HASH_WORKERS) or 1  # Ceiling division
+    futures = [_password_executor.submit(backend.hash_many, passwords[start:start + batch_size])
+               for start in range(0, len(passwords), batch_size)]
+    return [hashed_password for future in futures for hashed_password in future.result()]
+
+
+def verify_password(password: str, hashed_password: str, backend: PasswordHashBackend = None):
+    """
+    Verify a password against its stored hash on the bounded password hashing pool.
+
+    Parameters:
+    - password (str): Plain text password provided by the user.
+    - hashed_password (str): The stored Argon2id or bcrypt hash.
+    - backend (PasswordHashBackend): Backend checking the hash; defaults to the application's backend.
+
+    Returns:
+    - True if the password matches the hash; False otherwise.
+    """
+    return _password_executor.submit((backend or _password_backend).verify, password, hashed_password).result()
+
+
+async def hash_password_async(password: str, backend: PasswordHashBackend = None):
+    """
+    Async variant of `hash_password`, awaiting the hash without occupying one of FastAPI's worker threads.
+
+    Parameters:
+    - password (str): Plain text password to hash.
+    - backend (PasswordHashBackend): Backend computing the hash; defaults to the application's backend.
+
+    Returns:
+    - The hash of the password.
+    """
+    return await asyncio.wrap_future(_password_executor.submit((backend or _password_backend).hash, password))
+
+
+async def verify_password_async(password: str, hashed_password: str, backend: PasswordHashBackend = None):
+    """
+    Async variant of `verify_password`, awaiting the check without occupying one of FastAPI's worker threads.
+
+    Parameters:
+    - password (str): Plain text password provided by the user.
+    - hashed_password (str): The stored Argon2id or bcrypt hash.
+    - backend (PasswordHashBackend): Backend checking the hash; defaults to the application's backend.
+
+    Returns:
+    - True if the password matches the hash; False otherwise.
+    """
+    return await asyncio.wrap_future(
+        _password_executor.submit((backend or _password_backend).verify, password, hashed_password))
@@ -0,0 +1,17 @@
+# Import necessary modules and libraries
+from typing import Any  # Type hint for arbitrary response content
+
+import orjson  # Fast JSON encoder implemented in Rust
+from fastapi.responses import JSONResponse  # Base JSON response class
+
+
+class ORJSONResponse(JSONResponse):
+    """
+    JSON response serialized with `orjson` instead of the standard library `json` module.
+
+    Used as the application's default response class, so every route returning data is encoded by orjson.
+    """
+
+    def render(self, content: Any) -> bytes:
+        # Encode the (already JSON-compatible) content straight to bytes
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
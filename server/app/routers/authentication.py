@@ -1,17 +1,23 @@
 # Standard library imports for time calculations
-from datetime import timedelta, \
-    datetime  # timedelta for specifying token expiration, datetime for current time operations
+from datetime import timedelta  # timedelta for specifying token expiration
+import base64  # base64url encoding of JWT segments
+import hashlib  # BLAKE2b for hashing raw tokens into cache keys, and SHA-256 for token signatures
+import hmac  # HMAC signing of HS256 tokens
+import threading  # Lock guarding the token cache across threadpool workers
+import time  # Wall-clock UNIX time for setting and checking the token `exp` claim
 
 # Type hinting and dependency annotations
 from typing import Annotated  # Annotated allows combining a type with additional metadata
 
 # FastAPI imports for creating API routes, handling dependencies, and raising HTTP exceptions
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.concurrency import run_in_threadpool  # Runs blocking database calls off the event loop
 
 # Pydantic for defining data models for request/response validation
 from pydantic import BaseModel
 
 # SQLAlchemy for ORM database session management
+from sqlalchemy import select, update, bindparam  # Core statements for the login lookup and password upgrades
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.exc import NoResultFound, MultipleResultsFound
 from sqlalchemy.exc import IntegrityError
@@ -19,14 +25,23 @@ from sqlalchemy.exc import IntegrityError
 # FastAPI's OAuth2 modules for form authentication and bearer token authentication
 from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
 
-# JWT handling using the `python-jose` library for encoding and decoding tokens
-from jose import jwt, JWTError
+# JWT handling using the `PyJWT` library for encoding and decoding tokens
+import jwt
+from jwt import InvalidTokenError
+
+# Fast JSON encoder for token payloads
+import orjson
+
+# Time-aware LRU cache used to remember already validated tokens
+from cachetools import TLRUCache, TTLCache
 
 # Local application imports
 from ..database import get_db_session  # Function to get the current DB session (dependency injection)
 from ..models import User  # ORM model representing the User table
-from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES  # Configuration for JWT and token expiration
-from passlib.context import CryptContext  # For hashing and verifying user passwords using bcrypt
+from ..config import SECRET_KEY, ALGORITHM, ACCESS_TOKEN_EXPIRE_MINUTES, TOKEN_CACHE_MAXSIZE, TOKEN_CACHE_TTL_SECONDS, \
+    USER_CACHE_MAXSIZE, USER_CACHE_TTL_SECONDS  # Configuration for JWT, token expiration and token/user caching
+from ..passwords import PasswordHashBackend, get_password_backend, password_needs_rehash, hash_password_async, \
+    verify_password_async  # Password hashing backend and helpers
 
 # Create a router instance to handle all authentication-related endpoints
 router = APIRouter(
@@ -34,10 +49,6 @@ router = APIRouter(
     tags=['authentication']  # Tags help organize the API documentation
 )
 
-# Set up password hashing context using bcrypt
-bcrypt_context = CryptContext(schemes=['bcrypt'],
-                              deprecated='auto')  # Allows for securely hashing and verifying passwords
-
 # OAuth2PasswordBearer is used for retrieving the bearer token from incoming requests
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')  # `tokenUrl` is the endpoint where clients can get a token
 
@@ -45,6 +56,152 @@ oauth2_bearer = OAuth2PasswordBearer(tokenUrl='auth/token')  # `tokenUrl` is the
 db_dependency = Annotated[Session, Depends(get_db_session)]
 
 
+def _b64url(data: bytes):
+    """
+    Encode bytes as base64url without padding, as used by every JWT segment.
+
+    Parameters:
+    - data (bytes): The bytes to encode.
+
+    Returns:
+    - The encoded segment.
+    """
+    return base64.urlsafe_b64encode(data).rstrip(b'=')
+
+
+# The JOSE header and signing key never change, so they are encoded once for every HS256 token
+_JWT_HEADER_B64 = _b64url(b'{"alg":"HS256","typ":"JWT"}')
+_SECRET_KEY_BYTES = SECRET_KEY.encode('utf-8')
+
+
+def _sign_hs256(payload: dict):
+    """
+    Encode and sign a JWT with HMAC-SHA256, reusing the pre-encoded header and key.
+
+    Parameters:
+    - payload (dict): The JSON-serializable claims to encode.
+
+    Returns:
+    - Encoded JWT token string.
+    """
+    signing_input = _JWT_HEADER_B64 + b'.' + _b64url(orjson.dumps(payload))
+    signature = hmac.new(_SECRET_KEY_BYTES, signing_input, hashlib.sha256).digest()
+    return (signing_input + b'.' + _b64url(signature)).decode('ascii')
+
+
+def _b64url_decode(segment: bytes):
+    """
+    Decode a base64url JWT segment, restoring the padding stripped by the encoder.
+
+    Parameters:
+    - segment (bytes): The encoded segment.
+
+    Returns:
+    - The decoded bytes.
+
+    Raises:
+    - ValueError: If the segment is not valid base64url.
+    """
+    return base64.urlsafe_b64decode(segment + b'=' * (-len(segment) % 4))
+
+
+# Registered claims validated by PyJWT beyond `exp`; tokens carrying any of them take the full decode path
+_EXTRA_VALIDATED_CLAIMS = ('nbf', 'iat', 'aud', 'iss')
+
+
+def _decode_token(token: str):
+    """
+    Verify a JWT and return its claims.
+
+    HS256 tokens carrying this server's header are verified directly: the signature is checked with a
+    constant-time comparison, the claims are parsed by orjson and the `exp` claim is checked. Every other
+    token (other algorithms, other headers, extra registered claims) goes through `jwt.decode`.
+
+    Parameters:
+    - token (str): The encoded JWT.
+
+    Returns:
+    - The token's claims.
+
+    Raises:
+    - InvalidTokenError: If the token is malformed, its signature doesn't match, or it has expired.
+    """
+    if ALGORITHM != 'HS256':
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    try:
+        header, payload, signature = token.encode('ascii').split(b'.')
+    except ValueError:
+        raise InvalidTokenError('Not enough or too many segments')
+    if header != _JWT_HEADER_B64:
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    try:
+        expected_signature = hmac.new(_SECRET_KEY_BYTES, header + b'.' + payload, hashlib.sha256).digest()
+        if not hmac.compare_digest(expected_signature, _b64url_decode(signature)):
+            raise InvalidTokenError('Signature verification failed')
+        claims = orjson.loads(_b64url_decode(payload))
+    except ValueError:  # Invalid base64 or JSON
+        raise InvalidTokenError('Invalid token encoding')
+    if not isinstance(claims, dict):
+        raise InvalidTokenError('Invalid payload')
+    if any(claim in claims for claim in _EXTRA_VALIDATED_CLAIMS):
+        return jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+
+    exp = claims.get('exp')
+    if exp is not None:
+        if not isinstance(exp, (int, float)) or isinstance(exp, bool):
+            raise InvalidTokenError('Expiration Time claim (exp) must be a number')
+        if exp <= time.time():
+            raise InvalidTokenError('Signature has expired')
+    return claims
+
+
+def _token_ttu(_key, value, now):
+    """
+    Compute the expiration time of a token cache entry.
+
+    Entries live for at most `TOKEN_CACHE_TTL_SECONDS`, and never past the token's own `exp` claim.
+
+    Parameters:
+    - _key (bytes): The hashed token (unused).
+    - value (tuple): The cached `(user, exp)` pair.
+    - now (float): The cache timer's current (monotonic) time.
+
+    Returns:
+    - The cache timer time at which the entry expires.
+    """
+    _user, exp = value
+    ttl = TOKEN_CACHE_TTL_SECONDS
+    if exp is not None:
+        ttl = min(ttl, exp - time.time())
+    return now + ttl
+
+
+# Cache of validated tokens, keyed by a 16-byte BLAKE2b digest of the raw token (the token itself is never stored)
+_token_cache = TLRUCache(maxsize=TOKEN_CACHE_MAXSIZE, ttu=_token_ttu)
+# Cache of user information (id, username, role), keyed by username
+_user_cache = TTLCache(maxsize=USER_CACHE_MAXSIZE, ttl=USER_CACHE_TTL_SECONDS)
+# cachetools caches are not thread-safe, and sync dependencies run in FastAPI's threadpool
+_cache_lock = threading.Lock()
+
+
+def invalidate_user(username: str):
+    """
+    Drop a user's cached information, e.g. after their role changed or their account was removed.
+
+    Both the user cache and every cached token resolving to the user are cleared, so the next request
+    reloads the user from the database.
+
+    Parameters:
+    - username (str): Username of the user to invalidate.
+    """
+    with _cache_lock:
+        _user_cache.pop(username, None)
+        stale_keys = [key for key, (user, _exp) in _token_cache.items() if user["username"] == username]
+        for key in stale_keys:
+            _token_cache.pop(key, None)
+
+
 # Request schema for creating a new user, used to validate incoming request data for user creation
 class CreateUserRequest(BaseModel):
     username: str
@@ -55,9 +212,6 @@ class CreateUserRequest(BaseModel):
     role: str
     phone_number: str
 
-    class Config:
-        arbitrary_types_allowed = True  # Allows arbitrary (non-Pydantic) types in the model, like `Session`
-
 
 # Response schema for token generation, representing the structure of the access token response
 class Token(BaseModel):
@@ -65,24 +219,77 @@ class Token(BaseModel):
     token_type: str  # Type of token (usually "bearer")
 
 
-def authenticate_user(username: str, password: str, db: Session):
+# Annotated dependency for getting the password hashing backend
+password_backend_dependency = Annotated[PasswordHashBackend, Depends(get_password_backend)]
+
+
+# Statements built once at import and executed with bound parameters, reusing the engine's compiled SQL cache
+_LOGIN_BY_USERNAME = select(User.id, User.username, User.role, User.hashed_password).where(
+    User.username == bindparam('username'))
+_UPDATE_HASHED_PASSWORD = update(User).where(User.id == bindparam('user_id')).values(
+    hashed_password=bindparam('new_hashed_password'))
+
+
+def _get_login(db: Session, username: str):
+    """
+    Fetch the columns needed to log a user in, then end the read transaction.
+
+    Ending the transaction returns the pooled connection before the slow password check, so a burst of logins
+    waiting on the hashing pool doesn't also hold every database connection.
+
+    Parameters:
+    - db (Session): The current database session.
+    - username (str): Username of the user attempting to log in.
+
+    Returns:
+    - Row with the user's id, username, role and hashed password; None if the user doesn't exist.
+    """
+    login = db.execute(_LOGIN_BY_USERNAME, {'username': username}).first()
+    db.rollback()  # Nothing was written; just release the connection
+    return login
+
+
+def _set_hashed_password(db: Session, user_id: int, hashed_password: str):
+    """
+    Store a new password hash for a user in a single UPDATE statement.
+
+    Parameters:
+    - db (Session): The current database session.
+    - user_id (int): ID of the user.
+    - hashed_password (str): The new password hash.
+    """
+    db.execute(_UPDATE_HASHED_PASSWORD, {'user_id': user_id, 'new_hashed_password': hashed_password})
+    db.commit()
+
+
+async def authenticate_user(username: str, password: str, db: Session, backend: PasswordHashBackend = None):
     """
     Authenticate user by verifying their password against the stored hashed password in the database.
 
+    Database calls run in the threadpool, while the slow hashing work is awaited on the password hashing pool,
+    so no worker thread or database connection is held while waiting for a hash.
+
     Parameters:
     - username (str): Username of the user attempting to log in.
     - password (str): Plain text password provided by the user.
     - db (Session): The current database session.
+    - backend (PasswordHashBackend): Backend checking (and re-hashing) the password; defaults to the application's.
+
+    Passwords stored with an outdated scheme or parameters are re-hashed with the current ones on success.
 
     Returns:
-    - User object if authentication is successful; None otherwise.
+    - Dictionary with user information (id, username, role) if authentication is successful; None otherwise.
     """
-    # Retrieve user from the database by username
-    user = db.query(User).filter(User.username == username).first()
+    # Retrieve the user's login columns from the database by username
+    login = await run_in_threadpool(_get_login, db, username)
     # Verify password against hashed password stored in the database
-    if not user or not bcrypt_context.verify(password, user.hashed_password):
+    if login is None or not await verify_password_async(password, login.hashed_password, backend):
         return None
-    return user
+    # Upgrade legacy hashes while the plain text password is at hand
+    if password_needs_rehash(login.hashed_password, backend):
+        new_hashed_password = await hash_password_async(password, backend)
+        await run_in_threadpool(_set_hashed_password, db, login.id, new_hashed_password)
+    return {'id': login.id, 'username': login.username, 'role': login.role}
 
 
 def create_access_token(data: dict, expires_delta: timedelta):
@@ -98,19 +305,25 @@ def create_access_token(data: dict, expires_delta: timedelta):
     """
     # Create a copy of the data and add expiration information
     encode = data.copy()
-    expire = datetime.utcnow() + expires_delta  # Calculate the expiration time
+    expire = int(time.time() + expires_delta.total_seconds())  # Calculate the expiration time as a UNIX timestamp
     encode.update({"exp": expire})
     # Encode the token with the secret key and algorithm
+    if ALGORITHM == 'HS256':
+        return _sign_hs256(encode)
     return jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
 
 
-def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency):
+def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: db_dependency, request: Request = None):
     """
     Decode JWT token to retrieve user information from the database.
 
+    When the user has to be loaded from the database, the `User` object is also stored on
+    `request.state.user_model`, so routes needing the full row can reuse it instead of querying again.
+
     Parameters:
     - token (str): JWT access token provided in the request header.
     - db (Session): The current database session.
+    - request (Request): The incoming request, if any.
 
     Returns:
     - Dictionary with user information (id, username, role) if token is valid.
@@ -118,31 +331,68 @@ def get_current_user(token: Annotated[str, Depends(oauth2_bearer)], db: db_depen
     Raises:
     - HTTPException: If token is invalid or user is not found.
     """
+    # Serve previously validated, unexpired tokens straight from the cache
+    key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    with _cache_lock:
+        cached = _token_cache.get(key)
+    if cached is not None and (cached[1] is None or cached[1] > time.time()):
+        return dict(cached[0])
+
     try:
-        # Decode JWT token to extract the payload
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        # Retrieve user from the database based on username in the payload
-        user = db.query(User).filter(User.username == payload.get("sub")).first()
+        # Verify the JWT token and extract its payload
+        payload = _decode_token(token)
+    except InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    # Look the user up in the cache first, then in the database based on username in the payload
+    username = payload.get("sub")
+    with _cache_lock:
+        user_data = _user_cache.get(username)
+    if user_data is None:
+        user = db.query(User).filter(User.username == username).first()
         if user is None:
             raise HTTPException(status_code=401, detail="Invalid user")
-        # Return a dictionary of user information
-        return {
+        if request is not None:
+            request.state.user_model = user
+        # Build a dictionary of user information
+        user_data = {
             "id": user.id,
             "username": user.username,
             "role": user.role
         }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+        with _cache_lock:
+            _user_cache[username] = user_data
+
+    # Only tokens that decoded successfully and matched a user are cached
+    with _cache_lock:
+        _token_cache[key] = (user_data, payload.get("exp"))
+    return dict(user_data)
+
+
+def _add_user(db: Session, user_model: User):
+    """
+    Insert a new user and commit it.
+
+    Parameters:
+    - db (Session): The current database session.
+    - user_model (User): The user to insert.
+
+    Raises:
+    - IntegrityError: If the username or email already exists.
+    """
+    db.add(user_model)
+    db.commit()
 
 
 @router.post("/", response_model=None, status_code=201)
-def create_user(user_request: CreateUserRequest, db: db_dependency):
+async def create_user(user_request: CreateUserRequest, db: db_dependency, backend: password_backend_dependency):
     """
     Register a new user account in the database.
 
     Parameters:
     - user_request (CreateUserRequest): The data model for creating a user, validated by Pydantic.
     - db (Session): The current database session.
+    - backend (PasswordHashBackend): The backend hashing the password.
 
     Returns:
     - HTTP 201: If user is created successfully
@@ -152,29 +402,14 @@ def create_user(user_request: CreateUserRequest, db: db_dependency):
 
     Process:
     - Validates the input data
-    - Checks for existing username/email
     - Hashes the password
-    - Creates and saves the user
+    - Creates and saves the user, relying on the database's unique indexes to reject existing usernames/emails
+
+    Database calls run in the threadpool, while the slow hashing work is awaited on the password hashing pool.
     """
     try:
-        # Check if username already exists
-        existing_user = db.query(User).filter(User.username == user_request.username).first()
-        if existing_user:
-            raise HTTPException(
-                status_code=409,
-                detail="Username already exists"
-            )
-
-        # Check if email already exists
-        existing_email = db.query(User).filter(User.email == user_request.email).first()
-        if existing_email:
-            raise HTTPException(
-                status_code=409,
-                detail="Email already exists"
-            )
-
         # Hash the password
-        hashed_password = bcrypt_context.hash(user_request.password)
+        hashed_password = await hash_password_async(user_request.password, backend)
 
         # Create user model
         user_model = User(
@@ -189,13 +424,24 @@ def create_user(user_request: CreateUserRequest, db: db_dependency):
         )
 
         # Save to database
-        db.add(user_model)
-        db.commit()
+        await run_in_threadpool(_add_user, db, user_model)
 
         return {"message": "User created successfully"}
 
     except IntegrityError as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
+        # The unique indexes on username and email report which one collided
+        error_message = str(e.orig)
+        if 'username' in error_message:
+            raise HTTPException(
+                status_code=409,
+                detail="Username already exists"
+            )
+        if 'email' in error_message:
+            raise HTTPException(
+                status_code=409,
+                detail="Email already exists"
+            )
         raise HTTPException(
             status_code=400,
             detail=f"Database integrity error: {str(e)}"
@@ -208,7 +454,7 @@ def create_user(user_request: CreateUserRequest, db: db_dependency):
         )
 
     except Exception as e:
-        db.rollback()
+        await run_in_threadpool(db.rollback)
         raise HTTPException(
             status_code=500,
             detail=f"An unexpected error occurred: {str(e)}"
@@ -216,13 +462,15 @@ def create_user(user_request: CreateUserRequest, db: db_dependency):
 
 
 @router.post("/token", response_model=Token)
-def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency):
+async def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depends()], db: db_dependency,
+                                 backend: password_backend_dependency):
     """
     Handle user login and return an access token if authentication is successful.
 
     Parameters:
     - form_data (OAuth2PasswordRequestForm): The OAuth2 form data containing `username` and `password`.
     - db (Session): The current database session.
+    - backend (PasswordHashBackend): The backend checking the password.
 
     Process:
     - Authenticates the user.
@@ -235,7 +483,7 @@ def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depen
     - HTTPException: If authentication fails.
     """
     # Authenticate the user with provided credentials
-    user = authenticate_user(form_data.username, form_data.password, db)
+    user = await authenticate_user(form_data.username, form_data.password, db, backend)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
@@ -243,7 +491,7 @@ def login_for_access_token(form_data: Annotated[OAuth2PasswordRequestForm, Depen
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     # Create the JWT access token
     access_token = create_access_token(
-        data={"sub": user.username, "role": user.role},
+        data={"sub": user['username'], "role": user['role']},
         expires_delta=access_token_expires
     )
     # Return the token and its type (bearer)
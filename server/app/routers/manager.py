@@ -1,10 +1,13 @@
 # Import necessary modules and libraries
 from typing import Annotated  # Used for type annotations and dependency injection metadata
 
+import orjson  # Fast JSON encoder for the streamed task rows
 from pydantic import BaseModel, Field  # Pydantic models for data validation and modeling
-from sqlalchemy.orm import Session  # ORM session for database operations
+from sqlalchemy import select, delete  # Core statements for the streamed query and single-statement deletes
+from sqlalchemy.orm import Session, raiseload  # ORM session for database operations, and N+1 query guard
 from fastapi import APIRouter, Depends, HTTPException, \
     Path  # FastAPI modules for routing, dependencies, and exception handling
+from fastapi.responses import StreamingResponse  # Response sending the body as it is generated
 from starlette import status  # Standard HTTP status codes
 
 # Import local modules and dependencies
@@ -24,39 +27,89 @@ db_dependency = Annotated[Session, Depends(get_db_session)]
 user_dependency = Annotated[dict, Depends(get_current_user)]
 
 
+def require_manager(user: user_dependency):
+    """
+    Dependency ensuring the authenticated user has the 'manager' role.
+
+    Runs before the route body, so unauthorized callers are rejected without any database work.
+
+    Parameters:
+    - **user**: The currently authenticated user information (dict with id, username, role).
+
+    Returns:
+    - The authenticated user information.
+
+    Raises:
+    - HTTP 401: If the user is not a manager.
+    """
+    if user is None or user.get('role') != 'manager':
+        raise HTTPException(status_code=401, detail='Authentication failed: Only managers are authorized.')
+    return user
+
+
+# Dependency for getting the authenticated user, restricted to managers
+manager_dependency = Annotated[dict, Depends(require_manager)]
+
+# Number of task rows fetched from the database per batch while streaming
+TASK_STREAM_BATCH_SIZE = 500
+
+
+def _task_to_dict(task: Task):
+    """
+    Convert a `Task` object into a JSON-serializable dictionary.
+
+    Parameters:
+    - task (Task): The task to convert.
+
+    Returns:
+    - Dictionary with the task's column values.
+    """
+    return {
+        'id': task.id,
+        'title': task.title,
+        'description': task.description,
+        'priority': task.priority,
+        'completed': task.completed,
+        'owner_id': task.owner_id
+    }
+
+
 @router.get("/tasks", status_code=status.HTTP_200_OK)
-async def get_all_tasks(user: user_dependency, db: db_dependency):
+def get_all_tasks(user: manager_dependency, db: db_dependency):
     """
     Fetch all tasks in the system. Restricted to users with the 'manager' role.
 
     Parameters:
-    - **user**: The currently authenticated user information (dict with id, username, role).
+    - **user**: The currently authenticated manager's information (dict with id, username, role).
     - **db**: The current database session for querying tasks.
 
     Returns:
-    - List of all `Task` objects in the database.
+    - A newline-delimited JSON (NDJSON) stream with one `Task` object per line.
 
     Raises:
     - HTTP 401: If the user is not authorized to access this resource.
     """
-    # Debugging line to print the user's role to the console
-    print(user.get('role'))
+    # Any relationship needed here must be eager loaded explicitly (e.g. `selectinload(Task.owner)`);
+    # `raiseload('*')` makes an accidental per-task lazy load fail instead of issuing one query per task.
+    stmt = select(Task).options(raiseload('*')).execution_options(yield_per=TASK_STREAM_BATCH_SIZE)
 
-    # Check if the user has the 'manager' role to access all tasks
-    if user is None or user.get('role') != 'manager':
-        raise HTTPException(status_code=401, detail='Authentication failed: Only managers are authorized.')
+    def generate_tasks():
+        # Fetch tasks in batches and send each batch as one chunk, so memory stays flat regardless of table size
+        # (the sync generator is iterated in the threadpool, so every chunk costs one thread round trip)
+        for partition in db.execute(stmt).scalars().partitions():
+            yield b''.join(orjson.dumps(_task_to_dict(task)) + b'\n' for task in partition)
 
-    # Retrieve and return all tasks from the database
-    return db.query(Task).all()
+    # Stream all tasks from the database
+    return StreamingResponse(generate_tasks(), media_type='application/x-ndjson')
 
 
 @router.delete("/task/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(user: user_dependency, db: db_dependency, task_id: int = Path(gt=0)):
+def delete_task(user: manager_dependency, db: db_dependency, task_id: int = Path(gt=0)):
     """
     Delete a specific task by its ID. Only users with the 'manager' role can perform this action.
 
     Parameters:
-    - **user**: The currently authenticated user information (dict with id, username, role).
+    - **user**: The currently authenticated manager's information (dict with id, username, role).
     - **db**: The current database session for querying and deleting tasks.
     - **task_id**: The ID of the task to be deleted (must be greater than 0).
 
@@ -67,17 +120,12 @@ async def delete_task(user: user_dependency, db: db_dependency, task_id: int = P
     - HTTP 401: If the user is not authorized to delete tasks.
     - HTTP 404: If the task with the given ID is not found.
     """
-    # Check if the user has the 'manager' role to delete tasks
-    if user is None or user.get('role') != 'manager':
-        raise HTTPException(status_code=401, detail='Authentication failed: Only managers are authorized.')
-
-    # Query the database for the task with the given ID
-    task_model = db.query(Task).filter(Task.id == task_id).first()
+    # Delete the task with the given ID in a single statement
+    result = db.execute(delete(Task).where(Task.id == task_id))
 
     # If the task is not found, raise a 404 HTTP exception
-    if task_model is None:
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail='Task not found')
 
-    # Delete the task and commit the transaction to the database
-    db.delete(task_model)
+    # Commit the transaction to the database
     db.commit()
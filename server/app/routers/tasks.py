@@ -2,6 +2,8 @@
 from typing import Annotated  # Used for type annotations and dependency metadata
 
 from pydantic import BaseModel, Field  # Pydantic models for data validation and serialization
+from sqlalchemy import select, update, \
+    delete  # Core statements; compiled SQL is cached across requests, and update/delete skip loading rows
 from sqlalchemy.orm import Session  # ORM session for database interactions
 from fastapi import APIRouter, Depends, HTTPException, \
     Path  # FastAPI modules for routing, dependencies, and exception handling
@@ -33,7 +35,7 @@ class TaskRequest(BaseModel):
 
 
 @router.get("/", status_code=status.HTTP_200_OK)
-async def read_all_tasks(user: user_dependency, db: db_dependency):
+def read_all_tasks(user: user_dependency, db: db_dependency):
     """
     Retrieve all tasks belonging to the authenticated user.
 
@@ -55,7 +57,7 @@ async def read_all_tasks(user: user_dependency, db: db_dependency):
 
 
 @router.post("/", status_code=status.HTTP_201_CREATED)
-async def create_task(user: user_dependency, db: db_dependency, task_request: TaskRequest):
+def create_task(user: user_dependency, db: db_dependency, task_request: TaskRequest):
     """
     Create a new task for the authenticated user.
 
@@ -72,14 +74,14 @@ async def create_task(user: user_dependency, db: db_dependency, task_request: Ta
     - HTTP 401: If the user is not authenticated.
     """
     # Create a new `Task` object with the request data and the user's ID as the owner
-    task_model = Task(**task_request.dict(), owner_id=user['id'])
+    task_model = Task(**task_request.model_dump(), owner_id=user['id'])
     # Add the new task to the session and commit it to the database
     db.add(task_model)
     db.commit()
 
 
 @router.put("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def update_task(user: user_dependency, db: db_dependency, task_request: TaskRequest, task_id: int = Path(gt=0)):
+def update_task(user: user_dependency, db: db_dependency, task_request: TaskRequest, task_id: int = Path(gt=0)):
     """
     Update a task's details based on its ID.
 
@@ -90,30 +92,25 @@ async def update_task(user: user_dependency, db: db_dependency, task_request: Ta
     - **task_id**: The ID of the task to be updated (must be greater than 0).
 
     Process:
-    - Finds the task by its ID and the user's ID.
-    - Updates the task's details.
+    - Updates the task's details in place, matching on its ID and the user's ID.
 
     Raises:
     - HTTP 404: If the task is not found.
     """
-    # Query the task from the database based on task ID and user's ownership
-    task_model = db.query(Task).filter(Task.id == task_id, Task.owner_id == user['id']).first()
+    # Update the task's fields in a single statement, restricted to the user's own task
+    stmt = update(Task).where(Task.id == task_id, Task.owner_id == user['id']).values(**task_request.model_dump())
+    result = db.execute(stmt)
 
-    # If task is not found, raise a 404 HTTP exception
-    if task_model is None:
+    # If no task matched, raise a 404 HTTP exception
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail='Task not found')
 
-    # Update the task's fields with the new values from `task_request`
-    for key, value in task_request.dict().items():
-        setattr(task_model, key, value)
-
-    # Add the updated task to the session and commit changes to the database
-    db.add(task_model)
+    # Commit changes to the database
     db.commit()
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
-async def delete_task(user: user_dependency, db: db_dependency, task_id: int = Path(gt=0)):
+def delete_task(user: user_dependency, db: db_dependency, task_id: int = Path(gt=0)):
     """
     Delete a task based on its ID.
 
@@ -123,26 +120,24 @@ async def delete_task(user: user_dependency, db: db_dependency, task_id: int = P
     - **task_id**: The ID of the task to be deleted (must be greater than 0).
 
     Process:
-    - Finds the task by its ID and the user's ID.
-    - Deletes the task from the database.
+    - Deletes the task from the database, matching on its ID and the user's ID.
 
     Raises:
     - HTTP 404: If the task is not found.
     """
-    # Query the task from the database based on task ID and user's ownership
-    task_model = db.query(Task).filter(Task.id == task_id, Task.owner_id == user['id']).first()
+    # Delete the task in a single statement, restricted to the user's own task
+    result = db.execute(delete(Task).where(Task.id == task_id, Task.owner_id == user['id']))
 
-    # If task is not found, raise a 404 HTTP exception
-    if task_model is None:
+    # If no task matched, raise a 404 HTTP exception
+    if result.rowcount == 0:
         raise HTTPException(status_code=404, detail='Task not found')
 
-    # Delete the task and commit the transaction to the database
-    db.delete(task_model)
+    # Commit the transaction to the database
     db.commit()
 
 
 @router.get("/{task_id}", status_code=status.HTTP_200_OK)
-async def get_task(user: user_dependency, db: db_dependency, task_id: int = Path(gt=0)):
+def get_task(user: user_dependency, db: db_dependency, task_id: int = Path(gt=0)):
     """
     Get a task's details based on its ID.
 
@@ -159,7 +154,8 @@ async def get_task(user: user_dependency, db: db_dependency, task_id: int = Path
     - HTTP 404: If the task is not found.
     """
     # Query the task from the database based on task ID and user's ownership
-    task_model = db.query(Task).filter(Task.id == task_id, Task.owner_id == user['id']).first()
+    stmt = select(Task).where(Task.id == task_id, Task.owner_id == user['id'])
+    task_model = db.execute(stmt).scalar_one_or_none()
 
     # If task is not found, raise a 404 HTTP exception
     if task_model is None:
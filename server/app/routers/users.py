@@ -1,16 +1,20 @@
 # Import necessary modules and libraries
 from typing import Annotated  # Used for type annotations and dependency metadata
+import hashlib  # Fast hashing for profile ETags
 
-from fastapi import APIRouter, Depends, \
-    HTTPException  # FastAPI modules for routing, dependencies, and exception handling
-from pydantic import BaseModel, Field  # Pydantic models for data validation and serialization
+from fastapi import APIRouter, Depends, HTTPException, Request, \
+    Response  # FastAPI modules for routing, dependencies, exception handling and request/response access
+from fastapi.concurrency import run_in_threadpool  # Runs blocking database calls off the event loop
+from pydantic import BaseModel, ConfigDict, Field, field_validator  # Pydantic models for data validation and serialization
+from sqlalchemy import select, update, bindparam  # Core statements and bound parameters for reusable statements
 from sqlalchemy.orm import Session  # ORM session for database interactions
-from passlib.context import CryptContext  # Password hashing and verification utility
 
 # Local application imports
 from ..database import get_db_session  # Function to get a database session (dependency injection)
 from ..models import User  # ORM model representing the User entity in the database
-from .authentication import get_current_user  # Function to retrieve the current authenticated user
+from ..passwords import PasswordHashBackend, get_password_backend, hash_password_async, \
+    verify_password_async  # Password hashing backend and helpers
+from .authentication import get_current_user  # Dependency resolving the current authenticated user
 
 # Initialize the router for user management routes
 router = APIRouter(
@@ -22,62 +26,164 @@ router = APIRouter(
 db_dependency = Annotated[Session, Depends(get_db_session)]
 # Dependency for injecting the current authenticated user's information
 user_dependency = Annotated[dict, Depends(get_current_user)]
+# Dependency for injecting the backend computing and checking password hashes
+password_backend_dependency = Annotated[PasswordHashBackend, Depends(get_password_backend)]
 
-# Set up password hashing context using bcrypt for secure password storage and verification
-bcrypt_context = CryptContext(schemes=['bcrypt'], deprecated='auto')
+
+# Statements built once at import and executed with bound parameters, so every request reuses the SQL
+# compiled into the engine's cache instead of building a new statement object
+_USER_BY_ID = select(User).where(User.id == bindparam('user_id'))
+_HASHED_PASSWORD_BY_ID = select(User.hashed_password).where(User.id == bindparam('user_id'))
+_UPDATE_HASHED_PASSWORD = update(User).where(User.id == bindparam('user_id')).values(
+    hashed_password=bindparam('new_hashed_password'))
 
 
 # Pydantic schema for password change request
 class UserVerification(BaseModel):
+    # Strict validation skips type coercion, frozen instances skip assignment validation, and unknown fields are rejected
+    model_config = ConfigDict(strict=True, frozen=True, extra='forbid')
+
     current_password: str  # Current password provided by the user for verification
     new_password: str = Field(min_length=6)  # New password with a minimum length of 6 characters
 
+    @field_validator('new_password')
+    @classmethod
+    def check_new_password_size(cls, value: str):
+        # bcrypt rejects input longer than 72 bytes, and UTF-8 characters can take up to 4 bytes each
+        if len(value.encode('utf-8')) > 72:
+            raise ValueError('Password must be at most 72 bytes long')
+        return value
+
+
+def _get_user_model(request: Request, db: Session, user: dict):
+    """
+    Return the authenticated user's `User` object.
+
+    Reuses the object loaded by `get_current_user` when available, and queries the database otherwise
+    (e.g. when the user was served from the authentication cache).
+    """
+    user_model = getattr(request.state, 'user_model', None)
+    if user_model is None:
+        user_model = db.execute(_USER_BY_ID, {'user_id': user['id']}).scalar_one_or_none()
+    return user_model
+
+
+def _get_hashed_password(request: Request, db: Session, user: dict):
+    """
+    Return the authenticated user's stored password hash.
+
+    Reuses the object loaded by `get_current_user` when available, and otherwise fetches only the hash column.
+    """
+    user_model = getattr(request.state, 'user_model', None)
+    if user_model is not None:
+        return user_model.hashed_password
+    return db.execute(_HASHED_PASSWORD_BY_ID, {'user_id': user['id']}).scalar_one_or_none()
+
+
+def _profile_etag(user_model: User):
+    """
+    Return the ETag identifying the current version of a user's profile.
+
+    The password hash gets a fresh salt on every password change, so it doubles as the profile's version.
+    """
+    digest = hashlib.blake2b(f'{user_model.id}:{user_model.hashed_password}'.encode('utf-8'), digest_size=8)
+    return f'"{digest.hexdigest()}"'
+
+
+def _etag_matches(request: Request, etag: str):
+    """
+    Check whether the request's `If-None-Match` header lists the given ETag (or `*`).
+    """
+    if_none_match = request.headers.get('if-none-match')
+    if not if_none_match:
+        return False
+    # Weak validators (`W/"..."`) compare equal to their strong counterparts for GET requests
+    candidates = {candidate.strip().removeprefix('W/') for candidate in if_none_match.split(',')}
+    return etag in candidates or '*' in candidates
+
+
+def _set_hashed_password(db: Session, user: dict, hashed_password: str):
+    """
+    Store a new password hash for the authenticated user in a single UPDATE statement.
+    """
+    db.execute(_UPDATE_HASHED_PASSWORD, {'user_id': user['id'], 'new_hashed_password': hashed_password})
+    db.commit()
+
 
 @router.get("/", status_code=200)
-def get_user_profile(user: user_dependency, db: db_dependency):
+def get_user_profile(request: Request, response: Response, user: user_dependency, db: db_dependency):
     """
     Retrieve the profile of the authenticated user.
 
     Parameters:
+    - **request**: The incoming request, possibly carrying the user object loaded during authentication
+      and an `If-None-Match` header from a previous response.
+    - **response**: The outgoing response, which receives the profile's `ETag` header.
     - **user**: The authenticated user's data (as a dictionary with id, username, role).
     - **db**: The current database session for querying the user.
 
     Returns:
-    - User object representing the authenticated user's profile.
+    - Dictionary with the authenticated user's public profile fields (never the password hash).
+    - An empty 304 Not Modified response if the client's cached copy is still current.
 
     Raises:
-    - HTTP 401: If the user is not authenticated.
+    - HTTP 401: If the user is not authenticated, or no longer exists.
     """
-    # Query and return the authenticated user's profile from the database
-    return db.query(User).filter(User.id == user['id']).first()
+    # Retrieve the authenticated user's profile, querying the database only if authentication didn't load it
+    user_model = _get_user_model(request, db, user)
+    # The user may have been removed while their token was still cached
+    if user_model is None:
+        raise HTTPException(status_code=401, detail='Invalid user')
+
+    # Skip serializing the profile when the client already holds the current version
+    etag = _profile_etag(user_model)
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers={'ETag': etag})
+    response.headers['ETag'] = etag
+    # Only expose the public profile fields
+    return {
+        'id': user_model.id,
+        'username': user_model.username,
+        'email': user_model.email,
+        'first_name': user_model.first_name,
+        'last_name': user_model.last_name,
+        'is_active': user_model.is_active,
+        'role': user_model.role,
+        'phone_number': user_model.phone_number
+    }
 
 
 @router.put("/password", status_code=200)
-def change_password(user: user_dependency, db: db_dependency, user_verification: UserVerification):
+async def change_password(request: Request, user: user_dependency, db: db_dependency,
+                          user_verification: UserVerification, backend: password_backend_dependency):
     """
     Update the authenticated user's password.
 
     Parameters:
+    - **request**: The incoming request, possibly carrying the user object loaded during authentication.
     - **user**: The authenticated user's data (as a dictionary with id, username, role).
     - **db**: The current database session for updating the user's password.
     - **user_verification**: Data for verifying and updating the password, validated using the `UserVerification` model.
+    - **backend**: The backend verifying the current password and hashing the new one.
 
     Process:
     - Verifies that the provided current password matches the stored hashed password.
     - Hashes the new password and updates it in the database.
 
+    Database calls run in the threadpool, while the slow hashing work is awaited on the password hashing pool,
+    so no worker thread sits idle waiting for a hash.
+
     Raises:
     - HTTP 401: If the provided current password is incorrect.
     """
-    # Retrieve the user model from the database based on user ID
-    user_model = db.query(User).filter(User.id == user['id']).first()
+    # Retrieve the stored password hash, querying the database only if authentication didn't load the user
+    hashed_password = await run_in_threadpool(_get_hashed_password, request, db, user)
 
     # Verify that the provided current password matches the stored hashed password
-    if not bcrypt_context.verify(user_verification.current_password, user_model.hashed_password):
+    if hashed_password is None or \
+            not await verify_password_async(user_verification.current_password, hashed_password, backend):
         raise HTTPException(status_code=401, detail='Incorrect current password')
 
     # Hash the new password and update the user's password in the database
-    user_model.hashed_password = bcrypt_context.hash(user_verification.new_password)
-    # Save the updated user model to the database
-    db.add(user_model)
-    db.commit()
+    new_hashed_password = await hash_password_async(user_verification.new_password, backend)
+    await run_in_threadpool(_set_hashed_password, db, user, new_hashed_password)
@@ -0,0 +1,41 @@
+# conftest.py
+
+import os  # Environment variables read by the application's configuration
+
+# Hash test passwords with minimal costs; the tests don't exercise hash strength.
+# This must be set before the application (and its config) is imported by the test modules.
+os.environ.setdefault('BCRYPT_ROUNDS', '4')
+os.environ.setdefault('ARGON2_TIME_COST', '1')
+os.environ.setdefault('ARGON2_MEMORY_COST', '1024')
+# The tests create their own schema in the test database; don't touch the application's database on startup.
+os.environ.setdefault('AUTO_CREATE_TABLES', '0')
+
+from fastapi.testclient import TestClient  # Import FastAPI's test client for testing
+import pytest  # Import pytest for writing fixtures
+
+from app.database import Base  # Import Base for model metadata
+from utils import engine  # Test database engine
+
+
+# Session-wide fixture creating the test database schema once, before any test runs, and dropping it at the end
+@pytest.fixture(scope='session', autouse=True)
+def test_database():
+    """
+    Fixture creating all tables in the test database based on model metadata, and dropping them once all tests ran.
+
+    Tests never leave rows behind (each one runs in a rolled-back transaction), so the schema is only reset here.
+    """
+    Base.metadata.create_all(bind=engine)
+    yield engine
+    Base.metadata.drop_all(bind=engine)
+
+
+# Session-wide fixture providing a single test client (and app startup) shared by every test module
+@pytest.fixture(scope='session')
+def client():
+    """
+    Fixture providing a test client for the FastAPI app.
+    """
+    from app.main import app
+    with TestClient(app) as test_client:
+        yield test_client
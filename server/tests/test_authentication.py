@@ -1,10 +1,14 @@
 # test_auth.py
 
 from utils import *  # Import utility functions and testing helpers
-from app.routers.authentication import get_db_session, authenticate_user, create_access_token, get_current_user
+from app.routers.authentication import get_db_session, authenticate_user, create_access_token, get_current_user, \
+    invalidate_user
+from app.passwords import verify_password  # Helper for checking stored password hashes
+import bcrypt  # Creating legacy bcrypt password hashes
 from app.config import SECRET_KEY, ALGORITHM  # Import secret key and algorithm for JWT encoding/decoding
-from jose import jwt  # JWT library for encoding and decoding tokens
+import jwt  # JWT library for encoding and decoding tokens
 from datetime import timedelta  # Time delta for token expiration
+import time  # Current UNIX time for checking token expiration
 import pytest  # Pytest framework for testing
 from fastapi import HTTPException  # FastAPI HTTP exception for error handling
 
@@ -12,26 +16,59 @@ from fastapi import HTTPException  # FastAPI HTTP exception for error handling
 app.dependency_overrides[get_db_session] = override_get_db
 
 
-def test_authenticate_user(test_user):
+@pytest.mark.asyncio
+async def test_authenticate_user(test_user):
     """
     Test user authentication with correct and incorrect credentials.
     """
     db = TestingSessionLocal()
 
     # Test with correct credentials
-    authenticated_user = authenticate_user(test_user.username, 'testpassword', db)
-    assert authenticated_user is not None
-    assert authenticated_user.username == test_user.username
+    authenticated_user = await authenticate_user(test_user.username, 'testpassword', db)
+    assert authenticated_user == {'id': test_user.id, 'username': test_user.username, 'role': test_user.role}
 
     # Test with incorrect password
-    non_authenticated_user = authenticate_user(test_user.username, 'wrongpassword', db)
+    non_authenticated_user = await authenticate_user(test_user.username, 'wrongpassword', db)
     assert non_authenticated_user is None  # Should return None if authentication fails
 
     # Test with non-existent username
-    non_existent_user = authenticate_user('nonexistentuser', 'testpassword', db)
+    non_existent_user = await authenticate_user('nonexistentuser', 'testpassword', db)
     assert non_existent_user is None  # Should return None if user is not found
 
 
+@pytest.mark.asyncio
+async def test_authenticate_user_upgrades_legacy_hash(test_user):
+    """
+    Test that a password stored as a legacy bcrypt hash still authenticates and is re-hashed with Argon2id.
+    """
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.id == test_user.id).first()
+    user.hashed_password = bcrypt.hashpw(b'testpassword', bcrypt.gensalt(rounds=4)).decode('utf-8')
+    db.commit()
+
+    assert await authenticate_user(test_user.username, 'testpassword', db) is not None
+    db.refresh(user)
+    assert user.hashed_password.startswith('$argon2id$')
+    assert verify_password('testpassword', user.hashed_password)
+
+
+@pytest.mark.asyncio
+async def test_authenticate_user_long_password_legacy_hash(test_user):
+    """
+    Test that a password longer than 72 bytes still matches the legacy bcrypt hash of its first 72 bytes.
+    """
+    long_password = 'x' * 100
+    db = TestingSessionLocal()
+    user = db.query(User).filter(User.id == test_user.id).first()
+    user.hashed_password = bcrypt.hashpw(long_password.encode('utf-8')[:72], bcrypt.gensalt(rounds=4)).decode('utf-8')
+    db.commit()
+
+    assert verify_password(long_password, user.hashed_password)
+    assert not verify_password('y' * 100, user.hashed_password)
+    assert not verify_password(long_password, '$2b$not-a-hash')
+    assert await authenticate_user(test_user.username, long_password, db) is not None
+
+
 def test_create_access_token():
     """
     Test JWT token creation with correct payload.
@@ -47,6 +84,20 @@ def test_create_access_token():
     assert decoded_token['role'] == 'user'
 
 
+def test_create_access_token_signature():
+    """
+    Test that created tokens carry a valid signature and expiration for standard JWT libraries.
+    """
+    data = {'sub': 'testuser', 'id': 1, 'role': 'user'}
+    token = create_access_token(data, timedelta(minutes=5))
+
+    # Decode with full signature and expiration verification
+    decoded_token = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+    assert jwt.get_unverified_header(token) == {'alg': 'HS256', 'typ': 'JWT'}
+    assert decoded_token['sub'] == 'testuser'
+    assert decoded_token['exp'] > time.time()
+
+
 @pytest.mark.asyncio
 async def test_get_current_user_valid_token(test_user):
     """
@@ -64,6 +115,55 @@ async def test_get_current_user_valid_token(test_user):
     assert user == {'id': test_user.id, 'username': test_user.username, 'role': test_user.role}  # Match expected user data
 
 
+@pytest.mark.asyncio
+async def test_get_current_user_cached_token(test_user):
+    """
+    Test that a previously validated token is served from the cache without touching the database.
+    """
+    encode = {'sub': test_user.username, 'id': test_user.id, 'role': test_user.role}
+    token = jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM)
+
+    # The first call validates the token and populates the cache
+    user = get_current_user(token=token, db=TestingSessionLocal())
+
+    # The second call must not need a database session at all
+    cached_user = get_current_user(token=token, db=None)
+    assert cached_user == user
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_cached_user(test_user):
+    """
+    Test that new tokens for an already resolved user skip the database until the user is invalidated.
+    """
+    expires_delta = timedelta(minutes=5)
+    data = {'sub': test_user.username, 'role': test_user.role}
+
+    # The first token resolves the user from the database
+    user = get_current_user(token=create_access_token(data, expires_delta), db=TestingSessionLocal())
+
+    class RecordingSession:
+        # Wraps a test session, recording every query made through it
+        def __init__(self):
+            self.session = TestingSessionLocal()
+            self.queries = 0
+
+        def query(self, *entities):
+            self.queries += 1
+            return self.session.query(*entities)
+
+    # A different token for the same user is resolved from the user cache
+    db = RecordingSession()
+    other_token = create_access_token({**data, 'scope': 'other'}, expires_delta)
+    assert get_current_user(token=other_token, db=db) == user
+    assert db.queries == 0
+
+    # Once invalidated, both cached tokens and the cached user require the database again
+    invalidate_user(test_user.username)
+    assert get_current_user(token=other_token, db=db) == user
+    assert db.queries == 1
+
+
 @pytest.mark.asyncio
 async def test_get_current_user_missing_payload():
     """
@@ -83,3 +183,87 @@ async def test_get_current_user_missing_payload():
     # Assert that the exception status code and detail are as expected
     assert excinfo.value.status_code == 401
     assert excinfo.value.detail == 'Invalid user'
+
+
+def test_create_user_duplicate_username(client, test_user):
+    """
+    Test that registering an already taken username is rejected.
+    """
+    request_data = {
+        'username': test_user.username,
+        'email': 'another@test.com',
+        'first_name': 'asad',
+        'last_name': 'ali',
+        'password': 'testpassword',
+        'role': 'user',
+        'phone_number': '0987654321'
+    }
+    response = client.post("/auth/", json=request_data)
+    assert response.status_code == 409
+    assert response.json() == {'detail': 'Username already exists'}
+
+
+def test_create_user_duplicate_email(client, test_user):
+    """
+    Test that registering an already used email is rejected.
+    """
+    request_data = {
+        'username': 'anotheruser',
+        'email': test_user.email,
+        'first_name': 'asad',
+        'last_name': 'ali',
+        'password': 'testpassword',
+        'role': 'user',
+        'phone_number': '0987654321'
+    }
+    response = client.post("/auth/", json=request_data)
+    assert response.status_code == 409
+    assert response.json() == {'detail': 'Email already exists'}
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_invalid_token():
+    """
+    Test error handling when the JWT token signature does not match.
+    """
+    # Sign the token with a different key than the server's
+    token = jwt.encode({'sub': 'user'}, 'not-the-secret-key', algorithm=ALGORITHM)
+
+    with pytest.raises(HTTPException) as excinfo:
+        get_current_user(token=token, db=TestingSessionLocal())
+
+    assert excinfo.value.status_code == 401
+    assert excinfo.value.detail == 'Invalid token'
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_expired_token(test_user):
+    """
+    Test that an expired token with a valid signature is rejected.
+    """
+    token = create_access_token({'sub': test_user.username, 'id': test_user.id, 'role': test_user.role},
+                                timedelta(seconds=-1))
+
+    with pytest.raises(HTTPException) as excinfo:
+        get_current_user(token=token, db=TestingSessionLocal())
+
+    assert excinfo.value.status_code == 401
+    assert excinfo.value.detail == 'Invalid token'
+
+
+@pytest.mark.asyncio
+async def test_get_current_user_other_header(test_user):
+    """
+    Test that tokens with another JOSE header are still verified, and that unsigned tokens are rejected.
+    """
+    # A valid token carrying an extra header field is verified through PyJWT
+    encode = {'sub': test_user.username, 'id': test_user.id, 'role': test_user.role}
+    token = jwt.encode(encode, SECRET_KEY, algorithm=ALGORITHM, headers={'kid': 'key-1'})
+    user = get_current_user(token=token, db=TestingSessionLocal())
+    assert user == {'id': test_user.id, 'username': test_user.username, 'role': test_user.role}
+
+    # An unsigned token is never accepted
+    token = jwt.encode(encode, None, algorithm='none')
+    with pytest.raises(HTTPException) as excinfo:
+        get_current_user(token=token, db=TestingSessionLocal())
+    assert excinfo.value.status_code == 401
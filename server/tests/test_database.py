@@ -0,0 +1,75 @@
+# test_database.py
+
+import asyncio  # Running overlapping requests through the middleware
+from utils import *  # Import utility functions for setting up test environment
+from app.database import SessionLocal, DBSessionMiddleware, get_db_session, \
+    engine as app_engine  # Request-scoped session registry and the middleware releasing it
+from app.routers.authentication import get_current_user  # Current user dependency to override
+from fastapi import status
+import pytest
+
+# Only the current user is overridden; these tests use the application's own request-scoped sessions
+app.dependency_overrides[get_current_user] = override_get_current_user
+
+
+@pytest.fixture
+def app_sessions(db_transaction):
+    """
+    Fixture serving requests with the application's `get_db_session`, bound to the test transaction.
+    """
+    override = app.dependency_overrides.pop(get_db_session, None)
+    SessionLocal.configure(bind=db_transaction)
+    yield
+    SessionLocal.remove()
+    SessionLocal.configure(bind=app_engine)
+    if override is not None:
+        app.dependency_overrides[get_db_session] = override
+
+
+@pytest.mark.asyncio
+async def test_overlapping_requests_get_distinct_sessions():
+    """
+    Test that concurrent requests each get their own session, reused within the request and released afterwards.
+    """
+    both_started = asyncio.Event()
+    sessions = []
+
+    async def endpoint(scope, receive, send):
+        session = get_db_session()
+        sessions.append(session)
+        if len(sessions) == 2:
+            both_started.set()
+        # Wait until the other request holds its session too, so the two requests overlap
+        await asyncio.wait_for(both_started.wait(), timeout=5)
+        assert get_db_session() is session  # Every dependency within the request shares the session
+        await send({'type': 'http.response.start', 'status': 200, 'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+
+    async def send(message):
+        pass
+
+    middleware = DBSessionMiddleware(endpoint)
+    await asyncio.gather(middleware({'type': 'http'}, None, send), middleware({'type': 'http'}, None, send))
+
+    assert sessions[0] is not sessions[1]
+    assert SessionLocal.registry.registry == {}
+
+
+def test_sessions_released_after_response(client, app_sessions, test_user):
+    """
+    Test that the request's session is released once the response has been sent.
+    """
+    response = client.get("/user/")
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()['username'] == 'asad'
+    assert SessionLocal.registry.registry == {}
+
+
+def test_sessions_released_after_streamed_response(client, app_sessions, test_task):
+    """
+    Test that the request's session is released once a streamed response body has been sent in full.
+    """
+    response = client.get("/manager/tasks")
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.text.splitlines()) == 1
+    assert SessionLocal.registry.registry == {}
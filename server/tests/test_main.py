@@ -1,14 +1,9 @@
 # test_main.py
 
-from fastapi.testclient import TestClient  # Import TestClient for testing FastAPI applications
-from app.main import app  # Import the main FastAPI app
 from fastapi import status  # Import status codes for HTTP assertions
 
-# Initialize the test client with the FastAPI app
-client = TestClient(app)
 
-
-def test_health_check():
+def test_health_check(client):
     """
     Test the health check endpoint to ensure the API is running.
     """
@@ -1,8 +1,12 @@
 # test_manager.py
 
+import json  # Decode the streamed NDJSON lines
 from utils import *  # Import utility functions for setting up test environment
 from app.routers.manager import get_db_session, get_current_user  # Import necessary dependencies for override
+from app.routers.manager import TASK_STREAM_BATCH_SIZE  # Number of tasks fetched and sent per streamed chunk
 from fastapi import status
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.orm import selectinload
 from app.models import Task  # Import Task model for database verification
 
 # Override the dependencies for test isolation
@@ -10,19 +14,51 @@ app.dependency_overrides[get_db_session] = override_get_db  # Override the datab
 app.dependency_overrides[get_current_user] = override_get_current_user  # Override the current user dependency
 
 
-def test_manager_read_all_authenticated(test_task):
+def test_manager_read_all_authenticated(client, test_task):
     """
     Test to read all tasks when the user is authenticated as a 'manager'.
     """
     # Send a GET request to fetch all tasks
     response = client.get("/manager/tasks")
     assert response.status_code == status.HTTP_200_OK  # Assert that the response status code is 200 OK
-    assert response.json() == [{'completed': False, 'title': 'Learn to Code',
-                                'description': 'Need to learn everyday',
-                                'id': 1, 'priority': 5, 'owner_id': 1}]  # Check if returned tasks match expected data
+    assert response.headers['content-type'] == 'application/x-ndjson'  # Tasks are streamed one JSON object per line
+    tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert tasks == [{'completed': False, 'title': 'Learn to Code',
+                      'description': 'Need to learn everyday',
+                      'id': 1, 'priority': 5, 'owner_id': 1}]  # Check if returned tasks match expected data
 
 
-def test_manager_delete_task(test_task):
+def test_manager_read_all_streams_batches(client, test_task):
+    """
+    Test that every task is streamed when there are more tasks than fit in one batch.
+    """
+    db = TestingSessionLocal()
+    db.add_all([Task(title=f'Task {index}', description='Streamed in batches', priority=1, completed=False,
+                     owner_id=1) for index in range(TASK_STREAM_BATCH_SIZE + 5)])
+    db.commit()
+
+    response = client.get("/manager/tasks")
+    assert response.status_code == status.HTTP_200_OK
+    tasks = [json.loads(line) for line in response.text.splitlines()]
+    assert len(tasks) == TASK_STREAM_BATCH_SIZE + 6  # Including the `test_task` fixture
+    assert len({task['id'] for task in tasks}) == len(tasks)
+
+
+def test_manager_read_all_not_manager(client, test_task):
+    """
+    Test that users without the 'manager' role cannot read all tasks.
+    """
+    # Temporarily authenticate as a regular user
+    app.dependency_overrides[get_current_user] = lambda: {'username': 'asad', 'id': 1, 'role': 'user'}
+    try:
+        response = client.get("/manager/tasks")
+    finally:
+        app.dependency_overrides[get_current_user] = override_get_current_user
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == {'detail': 'Authentication failed: Only managers are authorized.'}
+
+
+def test_manager_delete_task(client, test_task):
     """
     Test to delete a specific task by its ID when the user is authenticated as a 'manager'.
     """
@@ -34,7 +70,7 @@ def test_manager_delete_task(test_task):
     assert model is None  # Verify that the task has been deleted from the database
 
 
-def test_manager_delete_task_not_found(test_task):
+def test_manager_delete_task_not_found(client, test_task):
     """
     Test to delete a task that does not exist when the user is authenticated as a 'manager'.
     """
@@ -42,3 +78,20 @@ def test_manager_delete_task_not_found(test_task):
     response = client.delete("/manager/task/99")
     assert response.status_code == status.HTTP_404_NOT_FOUND  # Assert that the response status code is 404 Not Found
     assert response.json() == {'detail': 'Task not found'}  # Check if the error message is as expected
+
+
+def test_task_owner_requires_eager_loading(test_user, test_task):
+    """
+    Test that a task's owner is only available when explicitly eager loaded.
+    """
+    db = TestingSessionLocal()
+
+    # Lazy loading the owner must fail instead of silently issuing an extra query per task
+    model = db.query(Task).filter(Task.id == test_task.id).first()
+    with pytest.raises(InvalidRequestError):
+        model.owner
+
+    # Eager loading the owner works in a single extra query for all tasks
+    db.expunge_all()
+    model = db.query(Task).options(selectinload(Task.owner)).filter(Task.id == test_task.id).first()
+    assert model.owner.id == test_task.owner_id
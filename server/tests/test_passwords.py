@@ -0,0 +1,40 @@
+# test_passwords.py
+
+from app import passwords  # Password hashing module, for inspecting its salt queue
+from app.passwords import hash_password, hash_passwords, verify_password  # Password hashing helpers
+
+
+def test_hash_password_uses_fresh_salts():
+    """
+    Test that hashing the same password twice yields different hashes that both verify.
+    """
+    first_hash = hash_password('testpassword')
+    second_hash = hash_password('testpassword')
+    assert first_hash != second_hash
+    assert verify_password('testpassword', first_hash)
+    assert verify_password('testpassword', second_hash)
+
+
+def test_restarted_salt_queue_discards_queued_salts():
+    """
+    Test that restarting the salt queue, as done in forked workers, never hands out the previously queued salts.
+    """
+    old_queue = passwords._salt_queue
+    old_salts = set(list(old_queue.queue))
+    assert old_salts
+
+    passwords._start_salt_queue()
+    assert passwords._salt_queue is not old_queue
+    new_salts = {passwords._next_salt() for _ in range(10)}
+    assert not new_salts & old_salts
+
+
+def test_hash_passwords():
+    """
+    Test hashing many passwords at once, keeping their order.
+    """
+    passwords = [f'password{index}' for index in range(10)]
+    hashed_passwords = hash_passwords(passwords)
+    assert len(hashed_passwords) == len(passwords)
+    assert all(verify_password(password, hashed) for password, hashed in zip(passwords, hashed_passwords))
+    assert hash_passwords([]) == []
@@ -9,7 +9,7 @@ app.dependency_overrides[get_current_user] = override_get_current_user
 app.dependency_overrides[get_db_session] = override_get_db
 
 
-def test_read_all_tasks_authenticated(test_task):
+def test_read_all_tasks_authenticated(client, test_task):
     """
     Test to read all tasks for the authenticated user.
     """
@@ -21,7 +21,7 @@ def test_read_all_tasks_authenticated(test_task):
                                 'priority': 5, 'owner_id': 1}]  # Check response content matches expected data
 
 
-def test_read_one_task_authenticated(test_task):
+def test_read_one_task_authenticated(client, test_task):
     """
     Test to read a specific task by its ID for the authenticated user.
     """
@@ -33,7 +33,7 @@ def test_read_one_task_authenticated(test_task):
                                'priority': 5, 'owner_id': 1}  # Check response content matches expected data
 
 
-def test_read_one_task_not_found(test_task):
+def test_read_one_task_not_found(client, test_task):
     """
     Test retrieving a non-existent task by ID for the authenticated user.
     """
@@ -43,7 +43,7 @@ def test_read_one_task_not_found(test_task):
     assert response.json() == {'detail': 'Task not found'}  # Verify the correct error message
 
 
-def test_create_task(test_task):
+def test_create_task(client, test_task):
     """
     Test creating a new task for the authenticated user.
     """
@@ -66,7 +66,7 @@ def test_create_task(test_task):
     assert model.completed == request_data.get('completed')
 
 
-def test_update_task(test_task):
+def test_update_task(client, test_task):
     """
     Test updating an existing task's details.
     """
@@ -89,7 +89,7 @@ def test_update_task(test_task):
     assert model.completed == request_data.get('completed')
 
 
-def test_update_task_not_found(test_task):
+def test_update_task_not_found(client, test_task):
     """
     Test updating a non-existent task.
     """
@@ -105,7 +105,7 @@ def test_update_task_not_found(test_task):
     assert response.json() == {'detail': 'Task not found'}  # Verify the correct error message
 
 
-def test_delete_task(test_task):
+def test_delete_task(client, test_task):
     """
     Test deleting an existing task by its ID.
     """
@@ -119,7 +119,7 @@ def test_delete_task(test_task):
     assert model is None
 
 
-def test_delete_task_not_found(test_task):
+def test_delete_task_not_found(client, test_task):
     """
     Test deleting a non-existent task.
     """
@@ -3,13 +3,15 @@
 from utils import *  # Import utility functions and test helpers
 from app.routers.users import get_db_session, get_current_user  # Import required dependencies for override
 from fastapi import status  # FastAPI status codes for HTTP assertions
+from app.passwords import verify_password, \
+    get_password_backend  # Helper for checking the stored password hash, and the hashing backend dependency
 
 # Override the dependencies for testing
 app.dependency_overrides[get_db_session] = override_get_db
 app.dependency_overrides[get_current_user] = override_get_current_user
 
 
-def test_get_user_profile(test_user):
+def test_get_user_profile(client, test_user):
     """
     Test retrieving the profile of the authenticated user.
     """
@@ -23,9 +25,38 @@ def test_get_user_profile(test_user):
     assert user_data['last_name'] == 'ali'
     assert user_data['role'] == 'admin'
     assert user_data['phone_number'] == '0987654321'
+    assert 'hashed_password' not in user_data  # The password hash is never exposed
 
 
-def test_change_password_success(test_user):
+def test_get_user_profile_deleted_user(client):
+    """
+    Test that the profile of an authenticated user whose row no longer exists is rejected.
+    """
+    response = client.get("/user/")
+    assert response.status_code == status.HTTP_401_UNAUTHORIZED
+    assert response.json() == {'detail': 'Invalid user'}
+
+
+def test_get_user_profile_not_modified(client, test_user):
+    """
+    Test that a profile request carrying the current ETag gets an empty 304 response, until the profile changes.
+    """
+    etag = client.get("/user/").headers['ETag']
+
+    # Send the ETag back; the profile is unchanged so it isn't sent again
+    response = client.get("/user/", headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert response.content == b''
+
+    # Changing the password produces a new ETag, so the profile is sent again
+    client.put("/user/password", json={'current_password': 'testpassword', 'new_password': 'testpassword1'})
+    response = client.get("/user/", headers={'If-None-Match': etag})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers['ETag'] != etag
+
+
+def test_change_password_success(client, test_user):
     """
     Test successfully changing the user's password.
     """
@@ -33,8 +64,48 @@ def test_change_password_success(test_user):
     response = client.put("/user/password", json={'current_password': 'testpassword', 'new_password': 'testpassword1'})
     assert response.status_code == status.HTTP_200_OK  # Assert that the response status code is 200 OK
 
+    # Verify that the new password hash has been stored in the database
+    db = TestingSessionLocal()
+    model = db.query(User).filter(User.id == test_user.id).first()
+    assert verify_password('testpassword1', model.hashed_password)
+
+
+def test_change_password_uses_injected_backend(client, test_user):
+    """
+    Test that changing the password and logging in go through the injected password hashing backend.
+    """
+    class PlainBackend:
+        def hash(self, password):
+            return 'plain:' + password
+
+        def verify(self, password, hashed_password):
+            # 'anything' stands in for the fixture's current password, which was hashed by the default backend
+            return hashed_password == 'plain:' + password or password == 'anything'
+
+        def hash_many(self, passwords):
+            return [self.hash(password) for password in passwords]
+
+        def needs_rehash(self, hashed_password):
+            return False
+
+    app.dependency_overrides[get_password_backend] = PlainBackend
+    try:
+        response = client.put("/user/password",
+                              json={'current_password': 'anything', 'new_password': 'testpassword1'})
+        assert response.status_code == status.HTTP_200_OK
+
+        db = TestingSessionLocal()
+        model = db.query(User).filter(User.id == test_user.id).first()
+        assert model.hashed_password == 'plain:testpassword1'
+
+        # Logging in checks the new hash with the same backend
+        response = client.post("/auth/token", data={'username': 'asad', 'password': 'testpassword1'})
+        assert response.status_code == status.HTTP_200_OK
+    finally:
+        del app.dependency_overrides[get_password_backend]
 
-def test_change_password_invalid_current_password(test_user):
+
+def test_change_password_invalid_current_password(client, test_user):
     """
     Test changing password with an incorrect current password.
     """
@@ -44,5 +115,21 @@ def test_change_password_invalid_current_password(test_user):
     assert response.json() == {'detail': 'Incorrect current password'}  # Validate error message
 
 
+def test_change_password_invalid_request(client, test_user):
+    """
+    Test that password change requests with unknown fields or a new password over 72 bytes are rejected.
+    """
+    response = client.put("/user/password", json={'current_password': 'testpassword', 'new_password': 'testpassword1',
+                                                  'role': 'manager'})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    response = client.put("/user/password", json={'current_password': 'testpassword', 'new_password': 'x' * 73})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+    # 72 characters, but 144 bytes in UTF-8
+    response = client.put("/user/password", json={'current_password': 'testpassword', 'new_password': 'é' * 72})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_CONTENT
+
+
 # If the endpoint for changing phone numbers was in the original `users.py`, and is removed in the updated
 # `user_management.py`: You should remove the associated test.
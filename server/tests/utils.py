@@ -1,29 +1,55 @@
-from sqlalchemy import create_engine, text  # Import engine and SQL text functionalities for database operations
+from sqlalchemy import create_engine, event  # Import engine creation and connection event hooks
 from sqlalchemy.orm import sessionmaker  # Import sessionmaker for database sessions
-from sqlalchemy.pool import StaticPool  # Use StaticPool for single-threaded tests
-from fastapi.testclient import TestClient  # Import FastAPI's test client for testing
+from sqlalchemy.pool import StaticPool  # Use StaticPool so every session shares the single in-memory connection
 import pytest  # Import pytest for writing test cases
 
-from app.database import Base  # Import Base for model metadata
 from app.models import Task, User  # Import Task and User models (updated from Todos and Users)
 from app.main import app  # Import the main FastAPI app for testing
-from app.routers.authentication import bcrypt_context  # Import bcrypt context for password hashing
+from app.passwords import hash_password  # Import helper for password hashing
 
-# Database URL for testing using an SQLite database
-SQLALCHEMY_DATABASE_URL = "sqlite:///./testdb.db"
+# Database URL for testing using an in-memory SQLite database (no files, no fsync)
+# Every pytest-xdist worker is a separate process, so each one automatically gets its own private database.
+SQLALCHEMY_DATABASE_URL = "sqlite:///:memory:"
 
 # Create an engine for the test database using SQLite
 engine = create_engine(
     SQLALCHEMY_DATABASE_URL,
     connect_args={'check_same_thread': False},  # Specific to SQLite for allowing multiple threads
-    poolclass=StaticPool,  # Use StaticPool to ensure connections aren't recycled across tests
+    poolclass=StaticPool,  # The in-memory database only lives as long as its single connection
 )
 
+
+# Let SQLAlchemy emit BEGIN itself; pysqlite's own transaction handling breaks SAVEPOINT support
+@event.listens_for(engine, "connect")
+def _disable_pysqlite_transactions(dbapi_connection, _connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine, "begin")
+def _begin_transaction(connection):
+    connection.exec_driver_sql("BEGIN")
+
+
 # Create a session factory for the test database
-TestingSessionLocal = sessionmaker(autocommit=False, bind=engine)
+# Sessions join the test's outer transaction through a SAVEPOINT, so their commits are rolled back after each test
+TestingSessionLocal = sessionmaker(autocommit=False, bind=engine, join_transaction_mode="create_savepoint")
 
-# Create all tables in the test database based on model metadata
-Base.metadata.create_all(bind=engine)
+
+# Pytest fixture running every test inside a transaction that is rolled back afterwards
+@pytest.fixture(autouse=True)
+def db_transaction():
+    """
+    Fixture binding all test sessions to one transaction, rolled back once the test is completed.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    TestingSessionLocal.configure(bind=connection)
+    yield connection
+
+    # Discard everything the test wrote instead of deleting it
+    TestingSessionLocal.configure(bind=engine)
+    transaction.rollback()
+    connection.close()
 
 
 # Override the database session dependency to use the test session
@@ -41,10 +67,6 @@ def override_get_current_user():
     return {'username': 'asad', 'id': 1, 'role': 'manager'}
 
 
-# Initialize a test client for the FastAPI app
-client = TestClient(app)
-
-
 # Pytest fixture to provide a test Task object
 @pytest.fixture
 def test_task():
@@ -61,13 +83,11 @@ def test_task():
     )
     db = TestingSessionLocal()
     db.add(task)  # Add the task to the test session
-    db.commit()  # Commit the task to the test database
+    db.commit()  # Commit the task to the test transaction
     yield task  # Yield the task for the test function to use
 
-    # Cleanup the Task from the test database after the test is completed
-    with engine.connect() as connection:
-        connection.execute(text("DELETE FROM tasks;"))
-        # connection.commit()
+    # The task is discarded when `db_transaction` rolls back the test transaction
+    db.close()
 
 
 # Pytest fixture to provide a test User object
@@ -76,27 +96,20 @@ def test_user():
     """
     Fixture to create and clean up a User for testing.
     """
-    # Create a User object for testing
-    import uuid
-    # Generate a unique username and email for each test run
-    unique_suffix = uuid.uuid4()
-    user_username = f"testuser_{unique_suffix}"
-    user_email = f"{user_username}@test.com"
+    # Create a User object for testing, matching the user returned by `override_get_current_user`
     user = User(
-        username=user_username,
-        email=user_email,
+        username='asad',
+        email='asad@test.com',
         first_name='asad',
         last_name='ali',
-        hashed_password=bcrypt_context.hash('testpassword'),
+        hashed_password=hash_password('testpassword'),
         role='admin',
         phone_number='0987654321',
     )
     db = TestingSessionLocal()
     db.add(user)  # Add the user to the test session
-    db.commit()  # Commit the user to the test database
+    db.commit()  # Commit the user to the test transaction
     yield user  # Yield the user for the test function to use
 
-    # Cleanup the User from the test database after the test is completed
-    with engine.connect() as connection:
-        connection.execute(text("DELETE FROM users;"))
-        # connection.commit()
+    # The user is discarded when `db_transaction` rolls back the test transaction
+    db.close()